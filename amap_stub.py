@@ -0,0 +1,154 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 本地模拟的高德地图 /v3/place/text 和 /v3/place/around 接口，用于在没有API key的情况下压测爬虫。
+# 使用方法：python amap_stub.py --port 8000，然后设置环境变量 AMAP_BASE_URL=http://localhost:8000
+
+# 深圳中心附近，用于生成地铁站坐标（GCJ-02）
+CENTER_LON, CENTER_LAT = 114.06, 22.55
+
+# 类型码前缀 -> 模拟时使用的完整类型码
+TYPECODE_SAMPLES = {
+    '0901': '090100', '0902': '090200', '1412': '141200', '1413': '141300',
+    '0601': '060100', '0603': '060300', '1100': '110000', '1000': '100102',
+    '1401': '140100', '1402': '140200', '1403': '140300', '1404': '140400',
+    '1405': '140500', '1406': '140600', '1407': '140700', '1201': '120100',
+    '1202': '120201', '1300': '130000', '1600': '160000', '1700': '170000',
+    '0707': '070700', '1409': '140900', '1411': '141100', '1501': '150104',
+    '1502': '150200', '1504': '150400', '1203': '120203',
+}
+
+
+class StubStats:
+    """请求统计，多线程共享"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.window = []  # 最近1秒内的请求时间，用于QPS限流
+
+    def record(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def over_qps(self, qps_limit):
+        now = time.time()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 1.0]
+            if qps_limit and len(self.window) >= qps_limit:
+                return True
+            self.window.append(now)
+            return False
+
+
+def seeded_random(*parts):
+    """相同的请求参数总是得到相同的结果"""
+    return random.Random(hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest())
+
+
+def place_text(params):
+    """关键字搜索：返回一个以关键字为种子的地铁站坐标"""
+    keywords = params.get('keywords', '')
+    rng = seeded_random(keywords)
+    if rng.random() < 0.02:  # 少量站点查不到
+        return {'status': '1', 'info': 'OK', 'infocode': '10000', 'count': '0', 'pois': []}
+    lon = CENTER_LON + rng.uniform(-0.3, 0.3)
+    lat = CENTER_LAT + rng.uniform(-0.1, 0.1)
+    return {
+        'status': '1', 'info': 'OK', 'infocode': '10000', 'count': '1',
+        'pois': [{'name': keywords, 'typecode': '150500', 'location': f'{lon:.6f},{lat:.6f}'}],
+    }
+
+
+def place_around(params, pois_per_type):
+    """周边搜索：按类型码生成固定数量的POI，并按 offset/page 分页"""
+    location = params.get('location', f'{CENTER_LON},{CENTER_LAT}')
+    lon, lat = map(float, location.split(','))
+    offset = int(params.get('offset', 20))
+    page = int(params.get('page', 1))
+
+    pois = []
+    for types in params.get('types', '').split('|'):
+        sample = TYPECODE_SAMPLES.get(types[:4], types)
+        rng = seeded_random(location, types)
+        for i in range(rng.randint(0, pois_per_type)):
+            pois.append({
+                'name': f'{sample}-{i}',
+                'typecode': sample,
+                'location': f'{lon + rng.uniform(-0.003, 0.003):.6f},{lat + rng.uniform(-0.003, 0.003):.6f}',
+            })
+
+    return {
+        'status': '1', 'info': 'OK', 'infocode': '10000', 'count': str(len(pois)),
+        'pois': pois[(page - 1) * offset: page * offset],
+    }
+
+
+def make_handler(args, stats):
+    class AmapStubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            if args.latency_ms:
+                time.sleep(random.uniform(0.5, 1.5) * args.latency_ms / 1000)
+
+            if url.path == '/v3/place/text':
+                handler = place_text
+            elif url.path == '/v3/place/around':
+                handler = lambda p: place_around(p, args.pois_per_type)
+            else:
+                stats.record('not_found')
+                self.send_error(404)
+                return
+
+            # 高德超出QPS限制时返回 status=0、infocode=10021
+            if stats.over_qps(args.qps_limit) or random.random() < args.error_rate:
+                stats.record('rate_limited')
+                body = {'status': '0', 'info': 'CUQPS_HAS_EXCEEDED_THE_LIMIT', 'infocode': '10021'}
+            else:
+                stats.record(url.path)
+                body = handler(params)
+
+            content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *log_args):
+            pass
+
+    return AmapStubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟高德地图POI搜索接口')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency-ms', type=float, default=50, help='平均响应延迟（毫秒）')
+    parser.add_argument('--qps-limit', type=int, default=0, help='每秒最大请求数，0表示不限')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回限流错误的比例')
+    parser.add_argument('--pois-per-type', type=int, default=60, help='每个类型码最多生成的POI数')
+    args = parser.parse_args()
+
+    stats = StubStats()
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), make_handler(args, stats))
+    print(f"高德接口模拟服务已启动：http://localhost:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("请求统计：", json.dumps(stats.counts, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
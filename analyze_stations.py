@@ -77,12 +77,12 @@ def get_weight(type_code):
     
     return 0
 
-def load_existing_data():
+def load_existing_data(type_file='station_type.csv', around_file='station_around.csv'):
     existing_stations = set()
-    if os.path.exists('station_type.csv') and os.path.exists('station_around.csv'):
+    if os.path.exists(type_file) and os.path.exists(around_file):
         try:
-            type_df = pd.read_csv('station_type.csv')
-            around_df = pd.read_csv('station_around.csv')
+            type_df = pd.read_csv(type_file)
+            around_df = pd.read_csv(around_file)
             # Only consider stations that exist in both files
             existing_stations = set(type_df['站名']) & set(around_df['站名'])
             print(f"Found {len(existing_stations)} stations in existing files")
@@ -162,16 +162,18 @@ def get_nearby_pois(longitude, latitude):
 
     return type_scores, poi_details
 
-def main():
+def main(coordinates_file='station_coordinates_gcj02.csv', type_file='station_type.csv',
+         around_file='station_around.csv'):
     # Read station coordinates
-    stations_df = pd.read_csv('station_coordinates_gcj02.csv')
+    stations_df = pd.read_csv(coordinates_file)
     total_stations = len(stations_df)
     
     # Load existing data
-    existing_stations = load_existing_data()
+    existing_stations = load_existing_data(type_file, around_file)
     
-    results = []
-    station_pois = []
+    # Keep previously processed stations so the files are appended to, not overwritten
+    results = pd.read_csv(type_file).to_dict('records') if existing_stations else []
+    station_pois = pd.read_csv(around_file).to_dict('records') if existing_stations else []
     
     for idx, row in stations_df.iterrows():
         station_name = row['站名']
@@ -211,8 +213,8 @@ def main():
         })
         
         # Save intermediate results after each station
-        pd.DataFrame(results).to_csv('station_type.csv', index=False)
-        pd.DataFrame(station_pois).to_csv('station_around.csv', index=False)
+        pd.DataFrame(results).to_csv(type_file, index=False)
+        pd.DataFrame(station_pois).to_csv(around_file, index=False)
         print(f"Saved results for {station_name}")
     
     print("\nAll stations processed successfully!")
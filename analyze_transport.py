@@ -28,11 +28,12 @@ def jsons_to_csv(jsons_file_path, csv_file_path):
                         # 写入 CSV 行
                         csv_writer.writerow([date, time, company_name, deal_type, station, card_no])
 
-# 文件路径
-jsons_file_path = '/Users/chubohan/Desktop/repo/final5024/2018record.jsons'  # 替换为实际 JSONS 文件路径
-csv_file_path = 'output.csv'  # 替换为所需 CSV 输出路径
+if __name__ == '__main__':
+    # 文件路径
+    jsons_file_path = '2018record.jsons'  # 替换为实际 JSONS 文件路径
+    csv_file_path = 'output.csv'  # 替换为所需 CSV 输出路径
 
-# 调用函数
-jsons_to_csv(jsons_file_path, csv_file_path)
+    # 调用函数
+    jsons_to_csv(jsons_file_path, csv_file_path)
 
-print(f"数据已成功转换为 CSV 文件：{csv_file_path}")
\ No newline at end of file
+    print(f"数据已成功转换为 CSV 文件：{csv_file_path}")
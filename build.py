@@ -0,0 +1,319 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import analyze_stations
+import build_database
+import build_density
+import convert_coordinates
+import forecast_flow
+import get_station_coordinates
+import segment_riders
+import station_registry
+import station_similarity
+import validate_records
+from analyze_transport import jsons_to_csv
+from transform_subway import transform
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = '.build_state.json'    # 各阶段上次成功运行时的输入指纹
+HASH_CACHE_FILE = '.build_hashes.json'  # 文件大小和修改时间 -> 内容哈希，避免重复计算
+
+
+# 各阶段的执行函数，在数据目录下运行，参数为命令行选项
+def run_extract(options):
+    jsons_to_csv(options['records'], 'output.csv')
+
+def run_transform(options):
+    transform('output.csv', 'output_transformed.csv')
+
+def run_geocode(options):
+    get_station_coordinates.main('output_transformed.csv', 'station_coordinates_gcj02.csv')
+
+def run_convert(options):
+    convert_coordinates.main('station_coordinates_gcj02.csv', 'station_coordinates.csv')
+
+def run_poi(options):
+    analyze_stations.main('station_coordinates_gcj02.csv', 'station_type.csv', 'station_around.csv')
+
+def run_validate(options):
+    validate_records.main()
+
+def run_registry(options):
+    station_registry.main()
+
+def run_segments(options):
+    segment_riders.main('output_validated.csv', options['workers'])
+
+def run_forecast(options):
+    forecast_flow.main('output_validated.csv', options['workers'])
+
+def run_database(options):
+    build_database.main('output_validated.csv')
+
+def run_density(options):
+    build_density.main('output_validated.csv', 'station_coordinates.csv', 'station_around.csv')
+
+def run_similarity(options):
+    station_similarity.main('output_validated.csv', 'station_type.csv')
+
+def run_clear_tiles(options):
+    # 源数据变化后，后端缓存的瓦片全部失效
+    if os.path.exists('tile_cache'):
+        shutil.rmtree('tile_cache')
+
+
+# 阶段依赖由输入输出文件推导：某阶段的输入是另一阶段的输出时，前者依赖后者。
+# optional 为可以不存在的输入文件，只计入指纹；sources 为阶段的代码文件，代码变化也会触发重新运行；
+# network 阶段需要调用高德API，只在指定 --online 时运行。
+STAGES = {
+    'extract': {
+        'run': run_extract, 'inputs': [], 'outputs': ['output.csv'],
+        'sources': ['analyze_transport.py'],
+    },
+    'transform': {
+        'run': run_transform, 'inputs': ['output.csv'], 'outputs': ['output_transformed.csv'],
+        'sources': ['transform_subway.py'],
+    },
+    'geocode': {
+        'run': run_geocode, 'inputs': ['output_transformed.csv'],
+        'outputs': ['station_coordinates_gcj02.csv'],
+        'sources': ['get_station_coordinates.py', 'subway-react/backend/station_names.py'], 'network': True,
+    },
+    'convert': {
+        'run': run_convert, 'inputs': ['station_coordinates_gcj02.csv'],
+        'outputs': ['station_coordinates.csv'], 'sources': ['convert_coordinates.py'],
+    },
+    'poi': {
+        'run': run_poi, 'inputs': ['station_coordinates_gcj02.csv'],
+        'outputs': ['station_type.csv', 'station_around.csv'],
+        'sources': ['analyze_stations.py'], 'network': True,
+    },
+    'validate': {
+        'run': run_validate, 'inputs': ['output_transformed.csv', 'station_coordinates.csv'],
+        'outputs': ['output_validated.csv', 'quarantine.csv', 'validation_report.json'],
+        'sources': ['validate_records.py'],
+    },
+    'registry': {
+        'run': run_registry,
+        'inputs': ['station_coordinates.csv', 'station_type.csv', 'output_validated.csv'],
+        'optional': ['station_renames.csv'],
+        'outputs': ['station_registry.csv', 'station_alias.csv'],
+        'sources': ['station_registry.py', 'subway-react/backend/station_names.py'],
+    },
+    'segments': {
+        'run': run_segments, 'inputs': ['output_validated.csv'],
+        'outputs': ['card_segments.csv', 'segment_summary.csv'],
+        'sources': ['segment_riders.py', 'subway-react/backend/time_slots.py'],
+    },
+    'forecast': {
+        'run': run_forecast, 'inputs': ['output_validated.csv'],
+        'outputs': ['forecast_profiles.npz'],
+        'sources': ['forecast_flow.py', 'subway-react/backend/time_slots.py'],
+    },
+    'database': {
+        'run': run_database,
+        'inputs': ['output_validated.csv', 'station_coordinates.csv', 'station_type.csv',
+                   'card_segments.csv', 'segment_summary.csv'],
+        'outputs': ['subway.db'],
+        'sources': ['build_database.py', 'subway-react/backend/time_slots.py'],
+    },
+    'density': {
+        'run': run_density,
+        'inputs': ['output_validated.csv', 'station_coordinates.csv', 'station_around.csv'],
+        'outputs': ['density_rasters.npz'],
+        'sources': ['build_density.py', 'subway-react/backend/time_slots.py'],
+    },
+    'similarity': {
+        'run': run_similarity, 'inputs': ['output_validated.csv', 'station_type.csv'],
+        'outputs': ['station_similarity.npz', 'station_clusters.csv'],
+        'sources': ['station_similarity.py', 'segment_riders.py', 'subway-react/backend/time_slots.py'],
+    },
+    'clear_tiles': {
+        'run': run_clear_tiles,
+        'inputs': ['output_validated.csv', 'station_coordinates.csv', 'station_around.csv'],
+        'outputs': [], 'sources': [],
+    },
+}
+
+
+def stage_dependencies():
+    """根据输入输出文件推导每个阶段依赖的上游阶段"""
+    producers = {output: name for name, stage in STAGES.items() for output in stage['outputs']}
+    return {
+        name: {producers[i] for i in stage['inputs'] if i in producers and producers[i] != name}
+        for name, stage in STAGES.items()
+    }
+
+
+def select_stages(targets, dependencies):
+    """目标阶段及其所有上游阶段"""
+    selected = set()
+    pending = list(targets or STAGES)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependencies[name])
+    return selected
+
+
+def file_hash(path, hash_cache):
+    """文件内容的 sha256，大小和修改时间不变时直接使用缓存"""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = hash_cache.get(key)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+        return cached[2]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    hash_cache[key] = [stat.st_size, stat.st_mtime, sha.hexdigest()]
+    return sha.hexdigest()
+
+
+def stage_inputs(name, options):
+    """阶段必需的输入文件，extract 阶段的输入为命令行指定的原始记录"""
+    inputs = list(STAGES[name]['inputs'])
+    if name == 'extract':
+        inputs.append(options['records'])
+    return inputs
+
+
+def stage_fingerprint(name, options, hash_cache):
+    """阶段的输入文件和代码文件的内容哈希"""
+    stage = STAGES[name]
+    inputs = stage_inputs(name, options) + stage.get('optional', [])
+    parts = {path: file_hash(path, hash_cache) for path in inputs}
+    parts.update({src: file_hash(os.path.join(ROOT_DIR, src), hash_cache) for src in stage['sources']})
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def run_stage(name, data_dir, options):
+    """在子进程中运行单个阶段"""
+    os.chdir(data_dir)
+    try:
+        STAGES[name]['run'](options)
+    except SystemExit as e:
+        # 例如数据校验未通过时以非零状态退出
+        if e.code:
+            raise RuntimeError(f'阶段 {name} 退出，状态码 {e.code}')
+    return name
+
+
+def load_json(path):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def build(data_dir, targets, options, jobs, force=False):
+    """按依赖顺序运行各阶段，互不依赖的阶段并行执行，输入未变化的阶段跳过"""
+    os.chdir(data_dir)
+    dependencies = stage_dependencies()
+    selected = select_stages(targets, dependencies)
+    state = {} if force else load_json(STATE_FILE)
+    hash_cache = load_json(HASH_CACHE_FILE)
+
+    done, failed, running = set(), set(), {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            # 找出所有上游已完成、需要运行的阶段
+            ready = []
+            for name in sorted(selected - done - failed - set(running.values())):
+                upstream = dependencies[name] & selected
+                if upstream & failed:
+                    failed.add(name)
+                    print(f"[跳过] {name}：上游阶段失败")
+                    continue
+                if not upstream <= done:
+                    continue
+
+                stage = STAGES[name]
+                fingerprint = stage_fingerprint(name, options, hash_cache)
+                outputs_exist = all(os.path.exists(o) for o in stage['outputs'])
+                missing = [i for i in stage_inputs(name, options) if not os.path.exists(i)]
+                if state.get(name) == fingerprint and outputs_exist:
+                    print(f"[未变化] {name}")
+                    done.add(name)
+                elif missing and outputs_exist:
+                    # 例如没有原始记录或未调用高德API时，沿用仓库中已有的输出
+                    print(f"[沿用] {name}：缺少 {', '.join(missing)}，使用现有输出")
+                    done.add(name)
+                elif stage.get('network') and not options['online']:
+                    print(f"[跳过] {name}：需要调用高德API，使用 --online 运行")
+                    done.add(name)
+                else:
+                    ready.append(name)
+
+            # 同时运行的阶段平分CPU，单独运行的阶段可以使用全部CPU
+            concurrent = min(jobs, len(running) + len(ready))
+            for name in ready:
+                print(f"[运行] {name}")
+                stage_options = dict(options, workers=max(1, (os.cpu_count() or 1) // concurrent))
+                running[pool.submit(run_stage, name, data_dir, stage_options)] = name
+
+            if not running:
+                if selected <= done | failed:
+                    break
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[失败] {name}：{e}")
+                    failed.add(name)
+                    continue
+                # 记录运行时的输入指纹，输出文件不计入
+                state[name] = stage_fingerprint(name, options, hash_cache)
+                done.add(name)
+                print(f"[完成] {name}")
+
+            save_json(state, STATE_FILE)
+            save_json(hash_cache, HASH_CACHE_FILE)
+
+    save_json(state, STATE_FILE)
+    save_json(hash_cache, HASH_CACHE_FILE)
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成所有派生数据，只重新运行输入发生变化的阶段')
+    parser.add_argument('targets', nargs='*',
+                        help=f'要生成的阶段（默认全部），会自动包含其上游阶段：{", ".join(STAGES)}')
+    parser.add_argument('--data-dir', default=os.path.join(ROOT_DIR, 'subway-react', 'public'),
+                        help='输入和输出文件所在目录，默认为后端读取的 subway-react/public')
+    parser.add_argument('--records', default='2018record.jsons', help='原始刷卡记录 JSONS 文件')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='并行运行的阶段数')
+    parser.add_argument('--online', action='store_true',
+                        help='运行需要调用高德API的阶段，默认沿用现有的站点坐标和POI数据')
+    parser.add_argument('--force', action='store_true', help='忽略指纹，重新运行所有阶段')
+    args = parser.parse_args()
+    unknown = set(args.targets) - set(STAGES)
+    if unknown:
+        parser.error(f'未知的阶段：{", ".join(sorted(unknown))}')
+
+    options = {'records': os.path.abspath(args.records), 'online': args.online}
+    ok = build(os.path.abspath(args.data_dir), args.targets, options, args.jobs, args.force)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import pandas as pd
+
+from shared import to_time_slot
+
+# 配置
+INPUT_FILE = 'output_validated.csv'
+DB_FILE = 'subway.db'
+CHUNK_SIZE = 500000
+
+# 可选的派生表：文件存在时一并导入
+OPTIONAL_TABLES = {
+    'station_coordinates': 'station_coordinates.csv',
+    'station_type': 'station_type.csv',
+    'card_segments': 'card_segments.csv',
+    'segment_summary': 'segment_summary.csv',
+}
+
+INDEXES = [
+    'CREATE INDEX idx_records_station ON records (站名, 日期, 交易类型, 时间段)',
+    'CREATE INDEX idx_records_date ON records (日期, 时间段)',
+    'CREATE INDEX idx_records_card ON records (card_no, 交易类型)',
+]
+
+
+def load_records(conn, input_file):
+    """分块导入刷卡记录，并预先计算30分钟时间段"""
+    total = 0
+    for chunk in pd.read_csv(input_file, chunksize=CHUNK_SIZE):
+        chunk['时间段'] = to_time_slot(chunk['时间'])
+        chunk.to_sql('records', conn, if_exists='append', index=False)
+        total += len(chunk)
+        print(f"已导入 {total} 条记录")
+
+    for statement in INDEXES:
+        conn.execute(statement)
+
+
+def build_station_flow(conn):
+    """按 日期 × 线路 × 站点 × 时间段 汇总进出站人数"""
+    conn.execute('''
+        CREATE TABLE station_flow AS
+        SELECT 日期, 地铁线路, 站名, 时间段,
+               SUM(交易类型 = 0) AS 进站,
+               SUM(交易类型 = 1) AS 出站
+        FROM records
+        GROUP BY 日期, 地铁线路, 站名, 时间段
+    ''')
+    conn.execute('CREATE INDEX idx_station_flow ON station_flow (日期, 时间段, 站名)')
+
+
+def main(input_file=INPUT_FILE):
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        load_records(conn, input_file)
+        build_station_flow(conn)
+
+        for table, path in OPTIONAL_TABLES.items():
+            if os.path.exists(path):
+                pd.read_csv(path).to_sql(table, conn, index=False)
+                print(f"已导入 {path} -> {table}")
+        if os.path.exists(OPTIONAL_TABLES['card_segments']):
+            conn.execute('CREATE INDEX idx_card_segments ON card_segments (card_no)')
+
+        conn.commit()
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+
+    print(f"数据库已保存到 {DB_FILE}")
+
+
+if __name__ == '__main__':
+    main()
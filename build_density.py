@@ -0,0 +1,111 @@
+import json
+import numpy as np
+import pandas as pd
+
+from shared import to_time_slot
+
+# 配置
+RECORDS_FILE = 'output_validated.csv'
+STATIONS_FILE = 'station_coordinates.csv'
+POIS_FILE = 'station_around.csv'
+OUTPUT_FILE = 'density_rasters.npz'
+CHUNK_SIZE = 500000
+
+# 深圳范围（WGS-84）和网格大小
+LON_MIN, LON_MAX = 113.75, 114.65
+LAT_MIN, LAT_MAX = 22.40, 22.87
+CELL_SIZE = 0.005        # 约500米
+BANDWIDTH = 0.01         # 高斯核标准差（度），约1公里
+NUM_SLOTS = 48
+NUM_POI_TYPES = 7
+
+NX = int(round((LON_MAX - LON_MIN) / CELL_SIZE))
+NY = int(round((LAT_MAX - LAT_MIN) / CELL_SIZE))
+
+
+def bin_points(lon, lat, weights=None, layers=None, num_layers=1):
+    """
+    将点按网格计数（或按权重求和），返回 [层, 纬度格, 经度格] 的数组。
+    layers 为每个点所属的层编号，如时间段或POI类型。
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    ix = np.floor((lon - LON_MIN) / CELL_SIZE).astype(int)
+    iy = np.floor((lat - LAT_MIN) / CELL_SIZE).astype(int)
+    layers = np.zeros(len(lon), dtype=int) if layers is None else np.asarray(layers, dtype=int)
+    weights = np.ones(len(lon)) if weights is None else np.asarray(weights, dtype=float)
+
+    inside = (ix >= 0) & (ix < NX) & (iy >= 0) & (iy < NY)
+    flat = (layers[inside] * NY + iy[inside]) * NX + ix[inside]
+    counts = np.bincount(flat, weights=weights[inside], minlength=num_layers * NY * NX)
+    return counts.reshape(num_layers, NY, NX)
+
+
+def gaussian_matrix(n):
+    """一维高斯核矩阵，第 j 列为网格 j 处的点扩散到各网格的权重"""
+    centers = np.arange(n)
+    sigma = BANDWIDTH / CELL_SIZE
+    return np.exp(-0.5 * ((centers[:, None] - centers[None, :]) / sigma) ** 2)
+
+
+def smooth(grids):
+    """对每一层做可分离的高斯核密度平滑：K_y · G · K_xᵀ"""
+    ky = gaussian_matrix(NY)
+    kx = gaussian_matrix(NX)
+    # 归一化使总量守恒（每个点的质量在全网格上积分为1）
+    ky /= ky.sum(axis=0, keepdims=True)
+    kx /= kx.sum(axis=0, keepdims=True)
+    # 按层广播的矩阵乘法，每层两次 BLAS 乘法，不逐元素展开三重求和
+    return ky @ grids @ kx.T
+
+
+def load_poi_grids(pois_file):
+    """按POI类型统计网格，第0层为所有类型之和"""
+    pois_df = pd.read_csv(pois_file)
+    pois = [poi['location'] for pois in pois_df['POIs'] for poi in json.loads(pois)]
+    # 同一POI可能出现在相邻站点的结果中，按坐标和类型去重
+    pois = pd.DataFrame(pois).drop_duplicates(subset=['x', 'y', 'type'])
+    grids = bin_points(pois['x'], pois['y'], layers=pois['type'], num_layers=NUM_POI_TYPES + 1)
+    grids[0] = grids[1:].sum(axis=0)
+    return grids
+
+
+def load_flow_grids(records_file, stations_file):
+    """按30分钟时间段统计各站点的日均进出站人数，并放到站点所在的网格上"""
+    counts = None
+    dates = set()
+    for chunk in pd.read_csv(records_file, usecols=['日期', '时间', '交易类型', '站名'], chunksize=CHUNK_SIZE):
+        dates.update(chunk['日期'].unique())
+        chunk['时间段'] = to_time_slot(chunk['时间'])
+        chunk_counts = chunk.groupby(['站名', '时间段', '交易类型']).size()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+
+    stations_df = pd.read_csv(stations_file).dropna()
+    flows = (counts / max(len(dates), 1)).rename('人数').reset_index().merge(stations_df, on='站名')
+
+    grids = {}
+    for deal_type, name in [(0, 'inflow'), (1, 'outflow')]:
+        rows = flows[flows['交易类型'] == deal_type]
+        grids[name] = bin_points(rows['经度'], rows['纬度'], weights=rows['人数'],
+                                 layers=rows['时间段'], num_layers=NUM_SLOTS)
+    return grids
+
+
+def main(records_file=RECORDS_FILE, stations_file=STATIONS_FILE, pois_file=POIS_FILE,
+         output_file=OUTPUT_FILE):
+    poi_grids = smooth(load_poi_grids(pois_file))
+    flow_grids = load_flow_grids(records_file, stations_file)
+
+    np.savez_compressed(
+        output_file,
+        bounds=np.array([LON_MIN, LAT_MIN, LON_MAX, LAT_MAX]),
+        cell_size=np.array(CELL_SIZE),
+        poi=poi_grids.astype(np.float32),                       # [类型(0为全部), 纬度格, 经度格]
+        inflow=smooth(flow_grids['inflow']).astype(np.float32),  # [时间段, 纬度格, 经度格]
+        outflow=smooth(flow_grids['outflow']).astype(np.float32),
+    )
+    print(f"密度栅格（{NY} x {NX}）已保存到 {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,4 +12,5 @@ def get_amap_key():
     return os.getenv('AMAP_API_KEY')
 
 # Other API configuration settings can be added here
-AMAP_BASE_URL = "https://restapi.amap.com"
+# Set AMAP_BASE_URL to point the crawlers at a local stub (see amap_stub.py)
+AMAP_BASE_URL = os.getenv('AMAP_BASE_URL', "https://restapi.amap.com")
@@ -34,9 +34,9 @@ def gcj02_to_wgs84(lon, lat):
     wgsLon = lon - dLon
     return wgsLon, wgsLat
 
-def main():
+def main(input_file='station_coordinates_gcj02.csv', output_file='station_coordinates.csv'):
     # 读取CSV文件
-    df = pd.read_csv('/Users/chubohan/Desktop/repo/final5024/subway-react/public/station_coordinates1.csv')
+    df = pd.read_csv(input_file)
     
     # 转换坐标
     converted_coords = [gcj02_to_wgs84(lon, lat) for lon, lat in zip(df['经度'], df['纬度'])]
@@ -44,8 +44,8 @@ def main():
     df['纬度'] = [coord[1] for coord in converted_coords]
     
     # 保存转换后的文件
-    df.to_csv('/Users/chubohan/Desktop/repo/final5024/subway-react/public/station_coordinates.csv', index=False)
-    print("坐标转换完成，已保存到 station_coordinates.csv")
+    df.to_csv(output_file, index=False)
+    print(f"坐标转换完成，已保存到 {output_file}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from shared import to_time_slot
+
+# 配置
+INPUT_FILE = 'output_validated.csv'
+MODEL_FILE = 'forecast_profiles.npz'
+CHUNK_SIZE = 500000      # 分块读取的行数
+NUM_SLOTS = 48          # 30分钟时间段
+NUM_DAY_TYPES = 2       # 0: 工作日, 1: 周末
+RECENT_DAYS = 7         # 用于水平修正的最近天数
+LEVEL_ALPHA = 0.5       # 水平修正的指数平滑系数
+
+
+def day_type(dates):
+    """工作日为0，周末为1"""
+    return (pd.to_datetime(dates).dayofweek >= 5).astype(int)
+
+
+def aggregate_slots(input_file):
+    """按 日期 × 站点 × 时间段 统计进出站人数，分块读取并累加"""
+    counts = None
+    for chunk in pd.read_csv(input_file, usecols=['日期', '时间', '交易类型', '站名'], chunksize=CHUNK_SIZE):
+        chunk['时间段'] = to_time_slot(chunk['时间'])
+        chunk_counts = chunk.groupby(['站名', '日期', '时间段', '交易类型']).size()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+    counts = counts.astype(int).unstack(fill_value=0)
+    return counts.reindex(columns=[0, 1], fill_value=0)
+
+
+def fit_station(station_counts):
+    """
+    拟合单个站点的季节模型：
+    profile[日类型, 进/出, 时间段] 为历史同类日该时段的平均人数，
+    level[进/出] 为最近几天实际总量与画像总量之比的指数平滑值。
+    """
+    station_counts = station_counts.droplevel('站名')
+    dates = station_counts.index.get_level_values('日期').unique().sort_values()
+    types = dict(zip(dates, day_type(dates)))
+
+    # 补全每天的48个时间段，缺失时段记为0
+    full_index = pd.MultiIndex.from_product([dates, range(NUM_SLOTS)], names=['日期', '时间段'])
+    daily = station_counts.reindex(full_index, fill_value=0).values.reshape(len(dates), NUM_SLOTS, 2)
+    daily = daily.transpose(0, 2, 1)  # [天, 进/出, 时间段]
+    date_types = np.array([types[d] for d in dates])
+
+    profile = np.zeros((NUM_DAY_TYPES, 2, NUM_SLOTS))
+    for t in range(NUM_DAY_TYPES):
+        if np.any(date_types == t):
+            profile[t] = daily[date_types == t].mean(axis=0)
+        else:
+            # 没有该类日期时用全部日期的平均值代替
+            profile[t] = daily.mean(axis=0)
+
+    level = np.ones(2)
+    for i in range(max(0, len(dates) - RECENT_DAYS), len(dates)):
+        expected = profile[date_types[i]].sum(axis=1)
+        ratio = np.divide(daily[i].sum(axis=1), expected, out=np.ones(2), where=expected > 0)
+        level = LEVEL_ALPHA * ratio + (1 - LEVEL_ALPHA) * level
+
+    return profile, level
+
+
+def main(input_file=INPUT_FILE, max_workers=None):
+    counts = aggregate_slots(input_file)
+    stations = counts.index.get_level_values('站名').unique().tolist()
+    print(f"共 {len(stations)} 个站点，开始并行拟合")
+
+    groups = [counts.xs(s, level='站名', drop_level=False) for s in stations]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(fit_station, groups, chunksize=8))
+
+    np.savez_compressed(
+        MODEL_FILE,
+        stations=np.array(stations),
+        profiles=np.stack([r[0] for r in results]),
+        levels=np.stack([r[1] for r in results]),
+    )
+    print(f"预测模型已保存到 {MODEL_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ import pandas as pd
 import requests
 import time
 from config import get_amap_key, AMAP_BASE_URL
+from shared import normalize_station_name
 
 def get_station_location(station_name, city="深圳"):
     """
@@ -12,7 +13,7 @@ def get_station_location(station_name, city="深圳"):
     
     params = {
         'key': api_key,
-        'keywords': f"{station_name}地铁站",
+        'keywords': f"{normalize_station_name(station_name)}地铁站",  # 避免出现“xx站地铁站”
         'city': city,
         'types': '150500',  # 地铁站POI类型码
         'output': 'json'
@@ -34,13 +35,13 @@ def get_station_location(station_name, city="深圳"):
         print(f"查询出错 ({station_name}): {str(e)}")
         return None, None
 
-def main():
+def main(input_file='output_transformed.csv', output_file='station_coordinates_gcj02.csv'):
     # 读取转换后的CSV文件
-    df = pd.read_csv('output_transformed.csv')
+    df = pd.read_csv(input_file, usecols=['站名'])
     
-    # 读取已有的坐标文件
+    # 读取已有的坐标文件（即上一次的输出），只查询缺少坐标的站点
     try:
-        existing_coordinates = pd.read_csv('station_coordinates1.csv')
+        existing_coordinates = pd.read_csv(output_file)
         print(f"已读取现有坐标文件，包含 {len(existing_coordinates)} 个站点")
     except FileNotFoundError:
         existing_coordinates = pd.DataFrame(columns=['站名', '经度', '纬度'])
@@ -77,8 +78,8 @@ def main():
     
     # 创建新的DataFrame并保存为CSV
     stations_df = pd.DataFrame(stations_data)
-    stations_df.to_csv('station_coordinates.csv', index=False, encoding='utf-8')
-    print(f"已保存站点坐标到 station_coordinates.csv")
+    stations_df.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"已保存站点坐标到 {output_file}")
     
     # 输出统计信息
     total = len(stations_df)
@@ -0,0 +1,94 @@
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import numpy as np
+import requests
+
+# 按 subway-react/src/App.js 的调用顺序回放前端请求：
+# 页面加载时请求 /stations 和 /flow，之后每次点击站点依次请求 /station_analysis、/station_type、/station_pois
+
+
+class LatencyRecorder:
+    """按接口记录每次请求的耗时和错误数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        print(f"{'接口':<20}{'请求数':>8}{'错误':>6}{'吞吐(次/秒)':>12}"
+              f"{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+        for endpoint, values in sorted(self.latencies.items()):
+            ms = np.array(values) * 1000
+            print(f"{endpoint:<20}{len(ms):>8}{self.errors.get(endpoint, 0):>6}{len(ms) / elapsed:>12.1f}"
+                  f"{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 95):>10.1f}"
+                  f"{np.percentile(ms, 99):>10.1f}{ms.max():>10.1f}")
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"共 {total} 次请求，耗时 {elapsed:.1f} 秒，总吞吐 {total / elapsed:.1f} 次/秒")
+
+
+def timed_get(session, base_url, endpoint, recorder, params=''):
+    start = time.perf_counter()
+    try:
+        response = session.get(f'{base_url}/{endpoint}{params}', timeout=60)
+        ok = response.ok
+    except requests.RequestException:
+        response, ok = None, False
+    recorder.record(endpoint, time.perf_counter() - start, ok)
+    return response
+
+
+def run_session(base_url, clicks, recorder, seed):
+    """模拟一个用户：加载页面后随机点击若干个站点"""
+    rng = random.Random(seed)
+    session = requests.Session()
+
+    response = timed_get(session, base_url, 'stations', recorder)
+    timed_get(session, base_url, 'flow', recorder)
+    if response is None or not response.ok:
+        return
+    stations = [s['站名'] for s in response.json()]
+
+    for _ in range(clicks):
+        station = quote(rng.choice(stations))
+        time_slot = rng.randint(0, 24)  # 与前端滑块范围一致，24表示全天
+        timed_get(session, base_url, 'station_analysis', recorder,
+                  f'?station={station}&time_slot={time_slot}')
+        timed_get(session, base_url, 'station_type', recorder, f'?station={station}')
+        timed_get(session, base_url, 'station_pois', recorder, f'?station={station}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按前端调用顺序回放请求，压测Flask后端')
+    parser.add_argument('--base-url', default='http://localhost:5000/api')
+    parser.add_argument('--sessions', type=int, default=50, help='模拟的用户数')
+    parser.add_argument('--concurrency', type=int, default=10, help='同时在线的用户数')
+    parser.add_argument('--clicks', type=int, default=5, help='每个用户点击站点的次数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(run_session, args.base_url, args.clicks, recorder, args.seed + i)
+            for i in range(args.sessions)
+        ]
+        for future in futures:
+            future.result()
+    recorder.report(time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from shared import to_time_slot
+
+# 配置
+INPUT_FILE = 'output_validated.csv'
+PARTITION_DIR = 'card_partitions'
+SEGMENTS_FILE = 'card_segments.csv'
+SUMMARY_FILE = 'segment_summary.csv'
+ROWS_PER_PARTITION = 1000000  # 每个分区的平均记录数，分区数随数据量增加，单个进程内存不变
+CHUNK_SIZE = 500000          # 分块读取的行数
+SEGMENT_LABELS = ['commuter', 'frequent', 'occasional']  # 每个聚类对应一个标签
+NUM_SEGMENTS = len(SEGMENT_LABELS)  # 聚类数
+SAMPLE_PER_PARTITION = 5000  # 每个分区用于拟合聚类中心的样本数
+RANDOM_SEED = 42
+
+FEATURE_COLUMNS = ['日均出行次数', '首次进站时段', '覆盖天数比例', '返程比例']
+
+
+def count_partitions(input_file):
+    """按文件行数确定分区数，只统计换行符，不解析CSV"""
+    rows = 0
+    with open(input_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            rows += block.count(b'\n')
+    return max(1, -(-rows // ROWS_PER_PARTITION))
+
+
+def partition_records(input_file, partition_dir, num_partitions):
+    """
+    第一遍：分块读取刷卡记录，按卡号哈希写入分区文件，
+    保证同一张卡的所有记录落在同一个分区。返回数据集中的日期总数。
+    """
+    if os.path.exists(partition_dir):
+        shutil.rmtree(partition_dir)
+    os.makedirs(partition_dir)
+
+    dates = set()
+    columns = ['日期', '时间', '交易类型', '站名', 'card_no']
+    for chunk in pd.read_csv(input_file, usecols=columns, chunksize=CHUNK_SIZE):
+        dates.update(chunk['日期'].unique())
+        part = pd.util.hash_pandas_object(chunk['card_no'], index=False) % num_partitions
+        for part_id, rows in chunk.groupby(part.values):
+            path = os.path.join(partition_dir, f'part_{part_id}.csv')
+            rows.to_csv(path, mode='a', index=False, header=not os.path.exists(path))
+    return len(dates)
+
+
+def build_features(path, total_days):
+    """对单个分区按卡号分组，计算每张卡的特征向量"""
+    df = pd.read_csv(path)
+    df['时间段'] = to_time_slot(df['时间'])
+    df = df.sort_values(['card_no', '日期', '时间'])
+
+    entries = df[df['交易类型'] == 0]
+    exits = df[df['交易类型'] == 1]
+
+    # 每天的首次进站、首次出站和最后出站
+    first_entry = entries.groupby(['card_no', '日期']).first()
+    first_exit = exits.groupby(['card_no', '日期'])['站名'].first()
+    last_exit = exits.groupby(['card_no', '日期'])['站名'].last()
+
+    # 居住站：每天首次进站最常见的站点；工作站：每天首次出站最常见的站点
+    home = (first_entry.reset_index().groupby(['card_no', '站名']).size()
+            .reset_index(name='n').sort_values('n')
+            .drop_duplicates('card_no', keep='last').set_index('card_no')['站名'])
+    work = (first_exit.reset_index().groupby(['card_no', '站名']).size()
+            .reset_index(name='n').sort_values('n')
+            .drop_duplicates('card_no', keep='last').set_index('card_no')['站名'])
+
+    # 返程比例：当天最后出站回到首次进站站点的天数占比
+    returned = (last_exit.reindex(first_entry.index) == first_entry['站名'])
+    active_days = first_entry.groupby(level='card_no').size()
+
+    features = pd.DataFrame({
+        '日均出行次数': entries.groupby('card_no').size() / active_days,
+        '首次进站时段': first_entry.groupby(level='card_no')['时间段'].median(),
+        '覆盖天数比例': active_days / total_days,
+        '返程比例': returned.groupby(level='card_no').mean(),
+        '居住站': home,
+        '工作站': work,
+    })
+    # 只有出站记录的卡没有进站特征，无法分群
+    return features.dropna(subset=FEATURE_COLUMNS)
+
+
+def sample_partition(path, total_days):
+    """计算分区特征并写回磁盘，只返回少量样本用于拟合聚类中心"""
+    features = build_features(path, total_days)
+    features.to_csv(path.replace('.csv', '_features.csv'))
+    n = min(len(features), SAMPLE_PER_PARTITION)
+    return features[FEATURE_COLUMNS].sample(n=n, random_state=RANDOM_SEED)
+
+
+def kmeans(data, k, max_iter=100):
+    """k-means++ 初始化的 Lloyd 迭代，返回聚类中心；不同的样本少于k个时聚类数相应减少"""
+    rng = np.random.default_rng(RANDOM_SEED)
+    k = min(k, len(np.unique(data, axis=0)))
+    centers = [data[rng.integers(len(data))]]
+    for _ in range(1, k):
+        dist = np.min(((data[:, None, :] - np.array(centers)[None]) ** 2).sum(-1), axis=1)
+        centers.append(data[rng.choice(len(data), p=dist / dist.sum())])
+    centers = np.array(centers)
+
+    for _ in range(max_iter):
+        labels = assign_segments(data, centers)
+        new_centers = np.array([
+            data[labels == i].mean(axis=0) if np.any(labels == i) else centers[i]
+            for i in range(k)
+        ])
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    return centers
+
+
+def assign_segments(data, centers):
+    """将每个样本分配到最近的聚类中心"""
+    return ((data[:, None, :] - centers[None]) ** 2).sum(-1).argmin(axis=1)
+
+
+def label_segments(raw_centers):
+    """
+    根据聚类中心（原始尺度）给分群命名，每个标签只分配给一个分群：
+    返程比例高且早高峰出发的为 commuter，其余中每日出行最多的为 frequent，最后为 occasional。
+    """
+    trips, slot, coverage, return_ratio = raw_centers.T
+    commute_score = return_ratio - np.abs(slot - 16) / 48  # 时间段16为8:00
+    daily_trips = trips * coverage                          # 平均到每个日历日的出行次数
+
+    remaining = list(range(len(raw_centers)))
+    labels = [None] * len(raw_centers)
+    for label, score in zip(SEGMENT_LABELS, [commute_score, daily_trips, -daily_trips]):
+        if not remaining:
+            break
+        best = max(remaining, key=lambda i: score[i])
+        labels[best] = label
+        remaining.remove(best)
+    return labels
+
+
+def segment_partition(path, mean, std, centers):
+    """对分区内的所有卡分配分群，连同居住站、工作站一起写出，返回文件路径"""
+    features = pd.read_csv(path.replace('.csv', '_features.csv'), index_col='card_no')
+    scaled = (features[FEATURE_COLUMNS].values - mean) / std
+    segments = features[['居住站', '工作站']].assign(分群=assign_segments(scaled, centers))
+    out_path = path.replace('.csv', '_segments.csv')
+    segments.to_csv(out_path)
+    return out_path
+
+
+def main(input_file=INPUT_FILE, max_workers=None):
+    num_partitions = count_partitions(input_file)
+    total_days = partition_records(input_file, PARTITION_DIR, num_partitions)
+    print(f"数据集共 {total_days} 天，已按卡号划分为 {num_partitions} 个分区")
+
+    paths = sorted(
+        os.path.join(PARTITION_DIR, name) for name in os.listdir(PARTITION_DIR)
+        if name.endswith('.csv')
+    )
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # 并行计算特征，并用各分区样本拟合聚类中心
+        samples = pd.concat(pool.map(sample_partition, paths, [total_days] * len(paths)))
+        sample_values = samples.values
+        mean = sample_values.mean(axis=0)
+        std = sample_values.std(axis=0)
+        std[std == 0] = 1
+        centers = kmeans((sample_values - mean) / std, NUM_SEGMENTS)
+
+        segment_paths = list(pool.map(
+            segment_partition, paths,
+            [mean] * len(paths), [std] * len(paths), [centers] * len(paths)
+        ))
+
+    # 逐个分区追加写出，避免一次性加载所有卡
+    with open(SEGMENTS_FILE, 'w', encoding='utf-8') as out:
+        out.write('card_no,居住站,工作站,分群\n')
+        for path in segment_paths:
+            with open(path, encoding='utf-8') as f:
+                next(f)
+                shutil.copyfileobj(f, out)
+
+    raw_centers = centers * std + mean
+    summary = pd.DataFrame(raw_centers, columns=FEATURE_COLUMNS)
+    summary.insert(0, '标签', label_segments(raw_centers))
+    summary.insert(0, '分群', range(len(raw_centers)))
+    summary.to_csv(SUMMARY_FILE, index=False)
+    print(summary)
+
+    shutil.rmtree(PARTITION_DIR)
+    print(f"分群结果已保存到 {SEGMENTS_FILE}，分群中心已保存到 {SUMMARY_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+import os
+import sys
+
+# 后端与数据处理脚本共用的函数放在 subway-react/backend 中，使后端可以单独部署；
+# 根目录的脚本统一从这里导入
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'subway-react', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from station_names import normalize_station_name
+from time_slots import to_time_slot
+
+__all__ = ['normalize_station_name', 'to_time_slot']
@@ -0,0 +1,67 @@
+import os
+import pandas as pd
+
+from shared import normalize_station_name
+
+# 配置
+REGISTRY_FILE = 'station_registry.csv'
+ALIAS_FILE = 'station_alias.csv'
+RENAMES_FILE = 'station_renames.csv'  # 改名的站点：旧站名,新站名
+SOURCE_FILES = ['station_coordinates.csv', 'station_type.csv', 'output_validated.csv']
+CHUNK_SIZE = 500000
+
+
+def load_station_renames(path=RENAMES_FILE):
+    """读取改名表：旧站名 -> 新站名，旧站名会作为别名指向新站名的ID"""
+    if not os.path.exists(path):
+        return {}
+    renames = pd.read_csv(path, dtype=str).dropna()
+    return dict(zip(renames['旧站名'], renames['新站名']))
+
+
+def collect_station_names():
+    """按来源文件的顺序收集所有出现过的站名"""
+    names = []
+    for path in SOURCE_FILES:
+        if not os.path.exists(path):
+            continue
+        for chunk in pd.read_csv(path, usecols=['站名'], chunksize=CHUNK_SIZE):
+            names.extend(chunk['站名'].dropna().unique())
+    return list(dict.fromkeys(names))
+
+
+def main():
+    renames = load_station_renames()
+
+    # 读取已有的注册表，保证已分配的ID不变
+    if os.path.exists(REGISTRY_FILE):
+        registry = pd.read_csv(REGISTRY_FILE)
+        print(f"已读取现有注册表，包含 {len(registry)} 个站点")
+    else:
+        registry = pd.DataFrame(columns=['站点ID', '站名'])
+
+    ids = {normalize_station_name(name): int(i) for i, name in zip(registry['站点ID'], registry['站名'])}
+    next_id = max(ids.values(), default=0) + 1
+    new_rows = []
+    for name in collect_station_names():
+        key = normalize_station_name(renames.get(name, name))
+        if key not in ids:
+            ids[key] = next_id
+            new_rows.append({'站点ID': next_id, '站名': renames.get(name, name)})
+            next_id += 1
+
+    registry = pd.concat([registry, pd.DataFrame(new_rows)], ignore_index=True)
+    registry.to_csv(REGISTRY_FILE, index=False)
+    print(f"新增 {len(new_rows)} 个站点，注册表已保存到 {REGISTRY_FILE}")
+
+    # 别名表：归一化后的站名和旧站名都指向同一个ID
+    aliases = {normalize_station_name(name): int(i) for i, name in zip(registry['站点ID'], registry['站名'])}
+    for old_name, new_name in renames.items():
+        if normalize_station_name(new_name) in aliases:
+            aliases[normalize_station_name(old_name)] = aliases[normalize_station_name(new_name)]
+    pd.DataFrame(list(aliases.items()), columns=['别名', '站点ID']).to_csv(ALIAS_FILE, index=False)
+    print(f"别名表已保存到 {ALIAS_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from segment_riders import kmeans, assign_segments
+from shared import to_time_slot
+
+# 配置
+RECORDS_FILE = 'output_validated.csv'
+TYPE_FILE = 'station_type.csv'
+OUTPUT_FILE = 'station_similarity.npz'
+CLUSTERS_FILE = 'station_clusters.csv'
+CHUNK_SIZE = 500000
+SLOT_MINUTES = 30        # 30 -> 48个时间段，10 -> 144个时间段
+NUM_CLUSTERS = 7         # 与POI主导类型的数量一致，便于对照
+
+NUM_SLOTS = 24 * 60 // SLOT_MINUTES
+
+
+def load_profiles(records_file):
+    """统计每个站点各时间段的进站和出站人数，拼接为 [进站..., 出站...] 的向量"""
+    counts = None
+    for chunk in pd.read_csv(records_file, usecols=['时间', '交易类型', '站名'], chunksize=CHUNK_SIZE):
+        chunk['时间段'] = to_time_slot(chunk['时间'], SLOT_MINUTES)
+        chunk_counts = chunk.groupby(['站名', '交易类型', '时间段']).size()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+
+    columns = pd.MultiIndex.from_product([[0, 1], range(NUM_SLOTS)], names=['交易类型', '时间段'])
+    return counts.unstack(['交易类型', '时间段'], fill_value=0).reindex(columns=columns, fill_value=0)
+
+
+def normalize_profiles(profiles):
+    """
+    进站、出站分别按站点总量归一化，只保留随时间变化的形状，
+    再做L2归一化，使向量点积即为余弦相似度。
+    """
+    values = profiles.values.astype(float).reshape(len(profiles), 2, NUM_SLOTS)
+    totals = values.sum(axis=2, keepdims=True)
+    shares = np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+    vectors = shares.reshape(len(profiles), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def main(records_file=RECORDS_FILE, type_file=TYPE_FILE, output_file=OUTPUT_FILE,
+         clusters_file=CLUSTERS_FILE):
+    profiles = load_profiles(records_file)
+    stations = profiles.index.tolist()
+    vectors = normalize_profiles(profiles)
+
+    similarity = vectors @ vectors.T
+    clusters = assign_segments(vectors, kmeans(vectors, min(NUM_CLUSTERS, len(stations))))
+
+    np.savez_compressed(
+        output_file,
+        stations=np.array(stations),
+        similarity=similarity.astype(np.float32),
+        clusters=clusters,
+    )
+
+    # 与POI主导类型对照
+    result = pd.DataFrame({'站名': stations, '客流聚类': clusters})
+    type_df = pd.read_csv(type_file, usecols=['站名', '主导类型'])
+    result = result.merge(type_df, on='站名', how='left')
+    result.to_csv(clusters_file, index=False)
+    print(pd.crosstab(result['客流聚类'], result['主导类型']))
+    print(f"相似度矩阵已保存到 {output_file}，聚类结果已保存到 {clusters_file}")
+
+
+if __name__ == '__main__':
+    main()
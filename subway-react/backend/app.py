@@ -1,61 +1,136 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
+from datetime import datetime, timedelta
+from station_index import StationIndex
+from storage import get_storage
+from tiles import build_poi_table, get_tile, is_valid_tile
 
 app = Flask(__name__)
 # 明确指定CORS配置
 CORS(app)
 
+# 数据存储后端（CSV 或 SQLite），由环境变量 SUBWAY_STORAGE 选择
+storage = get_storage()
+FLOW_DATE = '2018-09-01'
+MAX_FORECAST_HORIZON = 1440  # 预测时长上限（分钟）
+NUM_POI_TYPES = 7  # POI类型编号为1-7
+NUM_TIME_SLOTS = 48  # 30分钟时间段编号为0-47
+
 # 缓存数据
 stations_data = None
+station_index = None  # 站名 -> 站点ID 索引
+station_location_data = None  # 按站点ID索引的坐标
 flow_data = None
+line_flow_data = None  # 按线路和站点划分的分时段客流
+transfer_data = None  # 进站线路 × 出站线路 的行程统计
 station_type_data = None
 station_pois_data = None  # 新增POIs数据缓存
+forecast_model = None  # 客流预测模型缓存
+tile_tables = None  # 矢量瓦片要素表缓存
+density_data = None  # 密度栅格缓存
+similarity_data = None  # 站点客流相似度缓存
 
 def load_data():
-    global stations_data, flow_data, station_type_data, station_pois_data
+    global stations_data, station_index, station_location_data
+    global flow_data, line_flow_data, station_type_data, station_pois_data
     if stations_data is None:
-        # 读取站点坐标数据
+        # 读取站点坐标、类型和POIs数据
         stations_df = pd.read_csv('../public/station_coordinates.csv')
+        type_df = pd.read_csv('../public/station_type.csv')
+        pois_df = pd.read_csv('../public/station_around.csv')
         stations_data = stations_df.to_dict('records')
         print("Loaded stations:", [station['站名'] for station in stations_data])  # 调试信息
+        
+        # 建立站名索引，之后的查找都按站点ID进行
+        station_index = StationIndex.load(
+            fallback_names=[*stations_df['站名'], *type_df['站名'], *pois_df['站名']]
+        )
+        station_location_data = {
+            station_index.resolve(s['站名']): s for s in stations_data
+        }
+        station_type_data = {
+            station_index.resolve(name): row
+            for name, row in type_df.set_index('站名').to_dict('index').items()
+        }
+        station_pois_data = {
+            station_index.resolve(name): pois
+            for name, pois in pois_df.set_index('站名')['POIs'].apply(eval).items()
+        }
     
     if flow_data is None:
-        # 读取并处理流量数据
-        flow_df = pd.read_csv('../public/output_transformed.csv')
-        # 只保留9月1日的数据
-        flow_df = flow_df[flow_df['日期'] == '2018-09-01']
-        
-        # 将时间转换为30分钟时间段，使用明确的时间格式
-        flow_df['时间段'] = pd.to_datetime(flow_df['时间'], format='%H:%M:%S').dt.hour * 2 + pd.to_datetime(flow_df['时间'], format='%H:%M:%S').dt.minute // 30
-        
-        # 按时间段和站点分组计算进出站人数
-        flow_by_time = []
-        for time_slot in range(48):  # 24小时 * 2个30分钟段
-            inflow = flow_df[(flow_df['时间段'] == time_slot) & (flow_df['交易类型'] == 0)].groupby('站名').size()
-            outflow = flow_df[(flow_df['时间段'] == time_slot) & (flow_df['交易类型'] == 1)].groupby('站名').size()
-            
-            # 合并进站和出站数据
-            flow_summary = pd.DataFrame({
-                '时间段': time_slot,
-                '进站': inflow,
-                '出站': outflow
-            }).fillna(0).reset_index()
-            
-            flow_by_time.extend(flow_summary.to_dict('records'))
-        
-        flow_data = flow_by_time
+        # 9月1日按 时间段 × 线路 × 站点 统计一次，站点客流由此按线路求和得到
+        line_flow_data = storage.line_station_flow(FLOW_DATE)
+        flow_data = line_flow_data.groupby(['时间段', '站名'])[['进站', '出站']].sum().reset_index().to_dict('records')
+        # 刷卡记录按原始站名存储，记下每个站点的所有写法
+        station_index.add_spellings(line_flow_data['站名'].unique())
 
-    if station_type_data is None:
-        # 读取站点类型数据
-        type_df = pd.read_csv('../public/station_type.csv')
-        station_type_data = type_df.set_index('站名').to_dict('index')
+def resolve_station(name):
+    """将请求中的站名解析为 (站点ID, 标准站名)，未找到时站点ID为None"""
+    if station_index is None:
+        load_data()
+    station_id = station_index.resolve(name)
+    return station_id, station_index.name(station_id) or name
 
-    if station_pois_data is None:
-        # 读取站点POIs数据
-        pois_df = pd.read_csv('../public/station_around.csv')
-        station_pois_data = pois_df.set_index('站名')['POIs'].apply(eval).to_dict()
+def station_rows(station_names):
+    """按站点ID分组模型中的行，同一站点的不同写法归入同一组"""
+    if station_index is None:
+        load_data()
+    rows = {}
+    for i, name in enumerate(station_names):
+        rows.setdefault(station_index.resolve(name), []).append(i)
+    return rows
+
+def load_forecast_model():
+    """读取 forecast_flow.py 生成的站点季节画像"""
+    global forecast_model
+    if forecast_model is None:
+        model = np.load('../public/forecast_profiles.npz')
+        forecast_model = {
+            'station_rows': station_rows(model['stations']),
+            'profiles': model['profiles'],  # [站点, 日类型, 进/出, 时间段]
+            'levels': model['levels'],      # [站点, 进/出]
+        }
+
+def load_density_data():
+    """读取 build_density.py 生成的POI和客流密度栅格"""
+    global density_data
+    if density_data is None:
+        rasters = np.load('../public/density_rasters.npz')
+        density_data = {key: rasters[key] for key in rasters.files}
+
+def load_similarity_data():
+    """读取 station_similarity.py 生成的相似度矩阵和客流聚类"""
+    global similarity_data
+    if similarity_data is None:
+        model = np.load('../public/station_similarity.npz')
+        similarity_data = {
+            'stations': model['stations'].tolist(),
+            'station_rows': station_rows(model['stations']),
+            'similarity': model['similarity'],
+            'clusters': model['clusters'],
+        }
+
+def load_tile_tables():
+    """将站点、POIs和分时段客流整理为带经纬度的要素表，供切片使用"""
+    global tile_tables
+    if stations_data is None or flow_data is None or station_pois_data is None:
+        load_data()
+    if tile_tables is None:
+        stations_df = pd.DataFrame(stations_data).rename(
+            columns={'站名': 'name', '经度': 'lon', '纬度': 'lat'}
+        ).dropna(subset=['lon', 'lat'])
+        flow_df = pd.DataFrame(flow_data).rename(
+            columns={'站名': 'name', '时间段': 'time_slot', '进站': 'inflow', '出站': 'outflow'}
+        ).merge(stations_df, on='name')
+        tile_tables = {
+            'stations': stations_df,
+            'pois': build_poi_table({
+                station_index.name(station_id): pois for station_id, pois in station_pois_data.items()
+            }),
+            'flow': flow_df,
+        }
 
 @app.route('/api/stations')
 def get_stations():
@@ -71,11 +146,56 @@ def get_flow():
         load_data()
     return jsonify(flow_data)
 
+@app.route('/api/line_flow')
+def get_line_flow():
+    """
+    获取线路客流。未指定线路时返回每条线路各时间段的进出站人数，
+    指定线路时返回该线路上各站点的进出站人数。
+    """
+    line = request.args.get('line')
+    time_slot = request.args.get('time_slot', type=int)
+    
+    if line_flow_data is None:
+        load_data()
+    
+    df = line_flow_data
+    if time_slot is not None:
+        df = df[df['时间段'] == time_slot]
+    
+    if line is None:
+        result = df.groupby(['地铁线路', '时间段'])[['进站', '出站']].sum().reset_index()
+    else:
+        df = df[df['地铁线路'] == line]
+        if df.empty:
+            return jsonify({'error': f'未找到线路 {line} 的客流数据'}), 404
+        result = df.groupby(['站名', '时间段'])[['进站', '出站']].sum().reset_index()
+    return jsonify(result.to_dict('records'))
+
+@app.route('/api/transfers')
+def get_transfers():
+    """获取进站线路与出站线路不同的换乘行程统计"""
+    global transfer_data
+    if transfer_data is None:
+        transfer_data = storage.transfers(FLOW_DATE)
+    trips = transfer_data
+    is_transfer = trips['进站线路'] != trips['出站线路']
+    transfers = trips[is_transfer].sort_values('人次', ascending=False)
+    
+    total_trips = int(trips['人次'].sum())
+    total_transfers = int(transfers['人次'].sum())
+    return jsonify({
+        'total_trips': total_trips,
+        'total_transfers': total_transfers,
+        'transfer_ratio': round(total_transfers / total_trips, 4) if total_trips else 0,
+        'transfers': transfers.to_dict('records')
+    })
+
 @app.route('/api/station_analysis')
 def analyze_station():
     """分析特定站点的客流数据"""
     station = request.args.get('station')
     time_slot = request.args.get('time_slot', type=int)
+    segment = request.args.get('segment')  # 可选，如 commuter 表示只看通勤乘客
     
     if not station:
         return jsonify({'error': '未提供站点名称'}), 400
@@ -83,58 +203,37 @@ def analyze_station():
     if flow_data is None:
         load_data()
     
-    # 读取原始数据以获取完整的进出站记录
-    df = pd.read_csv('../public/output_transformed.csv')
-    df['时间段'] = pd.to_datetime(df['时间'], format='%H:%M:%S').dt.hour * 2 + pd.to_datetime(df['时间'], format='%H:%M:%S').dt.minute // 30
+    if segment and not storage.has_segment(segment):
+        return jsonify({'error': f'未找到分群 {segment}'}), 404
     
-    # 筛选9月1日数据
-    df = df[df['日期'] == '2018-09-01']
+    # 统一为标准站名，并按该站点的所有写法查询记录
+    station_id, station = resolve_station(station)
+    station_names = station_index.names_for(station_id) if station_id is not None else [station]
     
     # 根据time_slot筛选数据
+    slot_range = None
     if time_slot != 24:  # 24表示全天
-        df = df[df['时间段'] >= 7]  # 从3:30开始
-        df = df[df['时间段'] <= 24]  # 到12:00结束
-    
-    # 1. 分析该站出站的乘客的进站来源
-    # 找到在指定时间段内从该站出站的所有card_no
-    target_exits = df[
-        (df['站名'] == station) & 
-        (df['交易类型'] == 1)  # 出站记录
-    ]['card_no'].unique()
-    
-    # 对这些卡号，找到他们的进站记录
-    entry_stations_all = df[
-        (df['card_no'].isin(target_exits)) & 
-        (df['交易类型'] == 0)  # 进站记录
-    ]['站名'].value_counts()
-    
-    # 分离top5和其他
-    entry_stations_top5 = entry_stations_all.head(5).to_dict()
+        slot_range = (7, 24)  # 从3:30开始，到12:00结束
+    
+    result = storage.station_od(station_names, FLOW_DATE, slot_range, segment)
+    
+    # 1. 该站出站的乘客的进站来源，分离top5和其他
+    entry_stations_all = result['entry_stations']
+    entry_stations_top5 = {k: int(v) for k, v in entry_stations_all.head(5).items()}
     entry_stations_others = entry_stations_all[5:].sum() if len(entry_stations_all) > 5 else 0
     
-    # 2. 分析该站进站的乘客的出站目的地
-    # 找到在指定时间段内从该站进站的所有card_no
-    target_entries = df[
-        (df['站名'] == station) & 
-        (df['交易类型'] == 0)  # 进站记录
-    ]['card_no'].unique()
-    
-    # 对这些卡号，找到他们的出站记录
-    exit_stations_all = df[
-        (df['card_no'].isin(target_entries)) & 
-        (df['交易类型'] == 1)  # 出站记录
-    ]['站名'].value_counts()
-    
-    # 分离top5和其他
-    exit_stations_top5 = exit_stations_all.head(5).to_dict()
+    # 2. 该站进站的乘客的出站目的地，分离top5和其他
+    exit_stations_all = result['exit_stations']
+    exit_stations_top5 = {k: int(v) for k, v in exit_stations_all.head(5).items()}
     exit_stations_others = exit_stations_all[5:].sum() if len(exit_stations_all) > 5 else 0
     
     # 计算总流量
-    total_entries = len(target_entries)
-    total_exits = len(target_exits)
+    total_entries = result['total_entries']
+    total_exits = result['total_exits']
     
     return jsonify({
         'station_name': station,
+        'segment': segment,
         'total_entries': total_entries,
         'total_exits': total_exits,
         'entry_stations': {
@@ -159,7 +258,8 @@ def get_station_type():
         load_data()
     
     # 查找站点数据
-    station_data = station_type_data.get(station)
+    station_id, _ = resolve_station(station)
+    station_data = station_type_data.get(station_id)
     if not station_data:
         return jsonify({'error': '未找到该站点的类型数据'}), 404
     
@@ -205,20 +305,15 @@ def get_station_pois():
         load_data()
     
     print("Looking for station:", station)  # 调试信息
-    print("Available stations:", [s['站名'] for s in stations_data])  # 调试信息
+    station_id, _ = resolve_station(station)
     
     # 获取站点POIs数据
-    pois = station_pois_data.get(station)
+    pois = station_pois_data.get(station_id)
     if not pois:
         return jsonify({'error': '未找到该站点的POIs数据'}), 404
     
     # 获取站点位置信息
-    station_info = None
-    for s in stations_data:
-        if s['站名'] == station:
-            station_info = s
-            break
-    
+    station_info = station_location_data.get(station_id)
     if not station_info:
         return jsonify({'error': f'未找到站点 {station} 的位置信息'}), 404
     
@@ -243,6 +338,197 @@ def get_station_pois():
         'pois': processed_pois
     })
 
+@app.route('/api/station_search')
+def search_stations():
+    """按站名、别名、前缀或近似写法搜索站点"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    
+    if station_index is None:
+        load_data()
+    
+    return jsonify(station_index.search(query, limit))
+
+@app.route('/api/density')
+def get_density():
+    """
+    获取密度栅格。category 为 all 或 1-7 时返回POI密度，
+    为 inflow/outflow 时返回指定30分钟时间段 slot 的日均客流密度。
+    """
+    category = request.args.get('category', 'all')
+    time_slot = request.args.get('slot', type=int)
+    
+    if density_data is None:
+        load_density_data()
+    
+    if category in ('inflow', 'outflow'):
+        if time_slot is None or not 0 <= time_slot < density_data[category].shape[0]:
+            return jsonify({'error': '客流密度需要提供 0-47 的时间段 slot'}), 400
+        grid = density_data[category][time_slot]
+    elif category == 'all' or category in [str(i) for i in range(1, 8)]:
+        grid = density_data['poi'][0 if category == 'all' else int(category)]
+    else:
+        return jsonify({'error': f'未知的类别 {category}'}), 400
+    
+    lon_min, lat_min, lon_max, lat_max = density_data['bounds'].tolist()
+    return jsonify({
+        'category': category,
+        'slot': time_slot,
+        'bounds': {'lon_min': lon_min, 'lat_min': lat_min, 'lon_max': lon_max, 'lat_max': lat_max},
+        'cell_size': float(density_data['cell_size']),
+        'shape': list(grid.shape),
+        'values': np.round(grid, 3).tolist()  # 第一行为最南端
+    })
+
+@app.route('/api/similar_stations')
+def get_similar_stations():
+    """获取分时段客流曲线与该站最相似的k个站点"""
+    station = request.args.get('station')
+    k = request.args.get('k', 5, type=int)
+    
+    if not station:
+        return jsonify({'error': '未提供站点名称'}), 400
+    if k < 1:
+        return jsonify({'error': 'k 应为正整数'}), 400
+    
+    if similarity_data is None:
+        load_similarity_data()
+    
+    station_id, station = resolve_station(station)
+    rows = similarity_data['station_rows'].get(station_id)
+    if station_id is None or rows is None:
+        return jsonify({'error': '未找到该站点的客流数据'}), 404
+    # 最多返回除自身以外的全部站点
+    k = min(k, len(similarity_data['station_rows']) - 1)
+    
+    def dominant_type(name):
+        station_data = station_type_data.get(station_index.resolve(name))
+        return int(station_data['主导类型']) if station_data else None
+    
+    # 同一站点有多种写法时取各写法相似度的平均值，
+    # 按相似度从高到低排序，跳过站点自身，其他站点只保留相似度最高的写法
+    row = similarity_data['similarity'][rows].mean(axis=0)
+    order, seen = [], {station_id}
+    for i in np.argsort(-row):
+        if len(order) == k:
+            break
+        other_id, name = resolve_station(similarity_data['stations'][i])
+        key = name if other_id is None else other_id
+        if key not in seen:
+            seen.add(key)
+            order.append((i, name))
+    similar = [{
+        'station_name': name,
+        'similarity': round(float(row[i]), 4),
+        'cluster': int(similarity_data['clusters'][i]),
+        'dominant_type': dominant_type(name)
+    } for i, name in order]
+    
+    return jsonify({
+        'station_name': station,
+        'cluster': int(similarity_data['clusters'][rows[0]]),
+        'dominant_type': dominant_type(station),
+        'similar_stations': similar
+    })
+
+@app.route('/api/forecast')
+def get_forecast():
+    """预测特定站点未来一段时间的进出站人数，按30分钟时间段返回"""
+    station = request.args.get('station')
+    horizon = request.args.get('horizon', '60')  # 预测时长（分钟）
+    start = request.args.get('start')  # 可选，格式 YYYY-MM-DD HH:MM，默认当前时间
+    
+    if not station:
+        return jsonify({'error': '未提供站点名称'}), 400
+    try:
+        horizon = int(horizon)
+    except ValueError:
+        horizon = 0
+    if not 0 < horizon <= MAX_FORECAST_HORIZON:
+        return jsonify({'error': f'horizon 应为 1-{MAX_FORECAST_HORIZON} 之间的整数（分钟）'}), 400
+    
+    if forecast_model is None:
+        load_forecast_model()
+    
+    station_id, station = resolve_station(station)
+    rows = forecast_model['station_rows'].get(station_id)
+    if station_id is None or rows is None:
+        return jsonify({'error': '未找到该站点的预测模型'}), 404
+    
+    try:
+        start_time = datetime.strptime(start, '%Y-%m-%d %H:%M') if start else datetime.now()
+    except ValueError:
+        return jsonify({'error': '时间格式应为 YYYY-MM-DD HH:MM'}), 400
+    
+    # 同一站点的不同写法分别建模，预测值为各写法的 画像 × 水平 之和
+    expected = (forecast_model['profiles'][rows] * forecast_model['levels'][rows][:, None, :, None]).sum(axis=0)
+    
+    # 从当前时间段开始的各30分钟时间段，跨过午夜时日类型按次日计算
+    slot_start = start_time.replace(minute=start_time.minute // 30 * 30, second=0, microsecond=0)
+    steps = np.arange(-(-horizon // 30))
+    absolute_slots = slot_start.hour * 2 + slot_start.minute // 30 + steps
+    time_slots = absolute_slots % 48
+    weekdays = (slot_start.weekday() + absolute_slots // 48) % 7
+    day_types = (weekdays >= 5).astype(int)
+    inflow = np.round(expected[day_types, 0, time_slots], 1)
+    outflow = np.round(expected[day_types, 1, time_slots], 1)
+    
+    forecast = [{
+        '时间': (slot_start + timedelta(minutes=30 * int(i))).strftime('%Y-%m-%d %H:%M'),
+        '时间段': int(slot),
+        '进站': float(in_value),
+        '出站': float(out_value),
+    } for i, slot, in_value, out_value in zip(steps, time_slots, inflow, outflow)]
+    
+    return jsonify({
+        'station_name': station,
+        'horizon': horizon,
+        'forecast': forecast
+    })
+
+@app.route('/tiles/stations/<int:z>/<int:x>/<int:y>.json')
+def get_station_tile(z, x, y):
+    """站点矢量瓦片"""
+    if not is_valid_tile(z, x, y):
+        return jsonify({'error': f'无效的瓦片坐标 {z}/{x}/{y}'}), 404
+    if tile_tables is None:
+        load_tile_tables()
+    content = get_tile('stations', tile_tables['stations'], z, x, y, ['name'])
+    return Response(content, mimetype='application/json')
+
+@app.route('/tiles/pois/<int:category>/<int:z>/<int:x>/<int:y>.json')
+def get_poi_tile(category, z, x, y):
+    """按POI类型（1-7）划分的矢量瓦片"""
+    if not is_valid_tile(z, x, y):
+        return jsonify({'error': f'无效的瓦片坐标 {z}/{x}/{y}'}), 404
+    # 参数会成为缓存目录名，必须在写入缓存前检查
+    if not 1 <= category <= NUM_POI_TYPES:
+        return jsonify({'error': f'无效的POI类型 {category}'}), 404
+    if tile_tables is None:
+        load_tile_tables()
+    pois = tile_tables['pois']
+    content = get_tile(
+        f'pois/{category}', pois[pois['type'] == category], z, x, y,
+        ['name', 'type', 'original_type', 'station']
+    )
+    return Response(content, mimetype='application/json')
+
+@app.route('/tiles/flow/<int:time_slot>/<int:z>/<int:x>/<int:y>.json')
+def get_flow_tile(time_slot, z, x, y):
+    """特定30分钟时间段的站点客流矢量瓦片"""
+    if not is_valid_tile(z, x, y):
+        return jsonify({'error': f'无效的瓦片坐标 {z}/{x}/{y}'}), 404
+    if not 0 <= time_slot < NUM_TIME_SLOTS:
+        return jsonify({'error': f'无效的时间段 {time_slot}'}), 404
+    if tile_tables is None:
+        load_tile_tables()
+    flow = tile_tables['flow']
+    content = get_tile(
+        f'flow/{time_slot}', flow[flow['time_slot'] == time_slot], z, x, y,
+        ['name', 'inflow', 'outflow'], sum_columns=('inflow', 'outflow')
+    )
+    return Response(content, mimetype='application/json')
+
 if __name__ == '__main__':
     # 预加载数据
     load_data()
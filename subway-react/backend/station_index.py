@@ -0,0 +1,91 @@
+import bisect
+import difflib
+import os
+import pandas as pd
+
+from station_names import normalize_station_name
+
+DATA_DIR = '../public'
+
+
+class StationIndex:
+    """站名 <-> 站点ID 的查询索引，支持别名、前缀和模糊搜索"""
+
+    def __init__(self, registry, aliases):
+        # registry: {站点ID: 站名}，aliases: {归一化别名: 站点ID}
+        self.names = registry
+        self.aliases = aliases
+        self.sorted_keys = sorted(aliases)
+        self.spellings = {}  # 站点ID -> 数据中出现过的原始站名
+
+    @classmethod
+    def load(cls, fallback_names=(), data_dir=DATA_DIR):
+        """
+        读取 station_registry.py 生成的注册表和别名表。
+        文件不存在时按 fallback_names 的顺序临时分配ID。
+        """
+        registry_path = os.path.join(data_dir, 'station_registry.csv')
+        alias_path = os.path.join(data_dir, 'station_alias.csv')
+        if os.path.exists(registry_path) and os.path.exists(alias_path):
+            registry_df = pd.read_csv(registry_path)
+            alias_df = pd.read_csv(alias_path)
+            registry = dict(zip(registry_df['站点ID'].astype(int), registry_df['站名']))
+            aliases = dict(zip(alias_df['别名'].astype(str), alias_df['站点ID'].astype(int)))
+        else:
+            registry, aliases = {}, {}
+            for name in fallback_names:
+                key = normalize_station_name(name)
+                if key not in aliases:
+                    aliases[key] = len(registry) + 1
+                    registry[aliases[key]] = name
+        return cls(registry, aliases)
+
+    def resolve(self, name):
+        """站名（含别名、全角、“站”后缀等写法）转换为站点ID，未找到返回None"""
+        if name is None:
+            return None
+        return self.aliases.get(normalize_station_name(name))
+
+    def name(self, station_id):
+        return self.names.get(station_id)
+
+    def add_spellings(self, names):
+        """记录数据中出现过的原始站名，数据按原始站名存储时需要用全部写法查询"""
+        for name in names:
+            station_id = self.resolve(name)
+            if station_id is not None:
+                self.spellings.setdefault(station_id, set()).add(name)
+
+    def names_for(self, station_id):
+        """站点ID对应的标准站名和数据中出现过的所有写法"""
+        names = self.spellings.get(station_id, set()) | {self.names[station_id]}
+        return sorted(names)
+
+    def search(self, query, limit=10):
+        """先返回精确匹配和前缀匹配，不足时补充包含匹配和模糊匹配"""
+        key = normalize_station_name(query)
+        if not key:
+            return []
+
+        matches = []
+        if key in self.aliases:
+            matches.append((self.aliases[key], 'exact'))
+
+        start = bisect.bisect_left(self.sorted_keys, key)
+        for alias in self.sorted_keys[start:]:
+            if not alias.startswith(key):
+                break
+            matches.append((self.aliases[alias], 'prefix'))
+
+        matches.extend((self.aliases[alias], 'contains') for alias in self.sorted_keys if key in alias)
+        for alias in difflib.get_close_matches(key, self.sorted_keys, n=limit, cutoff=0.5):
+            matches.append((self.aliases[alias], 'fuzzy'))
+
+        # 同一站点只保留最优的匹配方式
+        results = []
+        seen = set()
+        for station_id, match in matches:
+            if station_id not in seen:
+                seen.add(station_id)
+                results.append({'id': station_id, 'name': self.names[station_id], 'match': match})
+        return results[:limit]
@@ -0,0 +1,15 @@
+import unicodedata
+
+
+def normalize_station_name(name):
+    """
+    站名归一化：全角转半角、去除空白，并去掉“地铁站”“站”后缀。
+    后端和根目录的数据处理脚本（经 shared.py）都使用这一实现。
+    """
+    name = unicodedata.normalize('NFKC', str(name)).strip().lower()
+    name = ''.join(name.split())
+    for suffix in ('地铁站', '站'):
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import pandas as pd
+
+from time_slots import to_time_slot
+
+DATA_DIR = '../public'
+RECORDS_FILE = 'output_validated.csv'  # 经 validate_records.py 校验后的刷卡记录
+
+
+class CsvStorage:
+    """直接读取CSV文件，每次查询都在内存中用pandas筛选"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.segment_cards = None
+
+    def _records(self, date):
+        # 线路编号既有数字也有未识别的原始名称，统一按字符串读取，避免缺失值时被转换为浮点数
+        df = pd.read_csv(os.path.join(self.data_dir, RECORDS_FILE), dtype={'地铁线路': str})
+        df = df[df['日期'] == date].copy()
+        df['时间段'] = to_time_slot(df['时间'])
+        return df
+
+    def _cards_in_segment(self, segment):
+        if self.segment_cards is None:
+            segments_df = pd.read_csv(os.path.join(self.data_dir, 'card_segments.csv'))
+            summary_df = pd.read_csv(os.path.join(self.data_dir, 'segment_summary.csv'))
+            self.segment_cards = segments_df.merge(summary_df[['分群', '标签']], on='分群')
+        return self.segment_cards.loc[self.segment_cards['标签'] == segment, 'card_no']
+
+    def line_station_flow(self, date):
+        """按 时间段 × 线路 × 站点 统计进出站人数，站点客流和线路客流都由此汇总得到"""
+        df = self._records(date)
+        counts = df.groupby(['时间段', '地铁线路', '站名', '交易类型']).size().unstack(fill_value=0)
+        counts = counts.reindex(columns=[0, 1], fill_value=0)
+        counts.columns = ['进站', '出站']
+        return counts.reset_index()
+
+    def transfers(self, date):
+        """将相邻的进站、出站记录配对为行程，统计 进站线路 × 出站线路 的人次"""
+        df = self._records(date).sort_values(['card_no', '时间'])
+        # 直接比较相邻两行的数组，不使用 shift，以免整数列因末行缺失被转换为浮点数
+        cards = df['card_no'].values
+        types = df['交易类型'].values
+        lines = df['地铁线路'].values
+        is_trip = (types[:-1] == 0) & (types[1:] == 1) & (cards[:-1] == cards[1:])
+        trips = pd.DataFrame({
+            '进站线路': lines[:-1][is_trip],
+            '出站线路': lines[1:][is_trip],
+        })
+        return trips.groupby(['进站线路', '出站线路']).size().reset_index(name='人次')
+
+    def station_od(self, station_names, date, slot_range=None, segment=None):
+        """
+        统计从该站出站乘客的进站来源，以及从该站进站乘客的出站目的地。
+        station_names 为同一站点在记录中的所有写法，
+        slot_range 为闭区间 (起始时间段, 结束时间段)，segment 为乘客分群标签。
+        """
+        df = self._records(date)
+        if slot_range is not None:
+            df = df[(df['时间段'] >= slot_range[0]) & (df['时间段'] <= slot_range[1])]
+        if segment is not None:
+            df = df[df['card_no'].isin(self._cards_in_segment(segment))]
+
+        at_station = df['站名'].isin(station_names)
+        target_exits = df[at_station & (df['交易类型'] == 1)]['card_no'].unique()
+        target_entries = df[at_station & (df['交易类型'] == 0)]['card_no'].unique()
+        return {
+            'total_entries': len(target_entries),
+            'total_exits': len(target_exits),
+            'entry_stations': df[df['card_no'].isin(target_exits) & (df['交易类型'] == 0)]['站名'].value_counts(),
+            'exit_stations': df[df['card_no'].isin(target_entries) & (df['交易类型'] == 1)]['站名'].value_counts(),
+        }
+
+    def has_segment(self, segment):
+        return not self._cards_in_segment(segment).empty
+
+
+class SQLiteStorage:
+    """读取 build_database.py 生成的SQLite数据库，查询在数据库内完成"""
+
+    def __init__(self, db_path=os.path.join(DATA_DIR, 'subway.db')):
+        self.db_path = db_path
+
+    def _connect(self):
+        # 每次查询使用独立的只读连接，可在多线程下安全使用
+        return sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+
+    def query(self, sql, params=()):
+        """执行参数化的SQL查询，返回DataFrame"""
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def line_station_flow(self, date):
+        """按 时间段 × 线路 × 站点 统计进出站人数，站点客流和线路客流都由此汇总得到"""
+        # 线路编号统一为字符串，与 CsvStorage 返回的类型一致
+        return self.query(
+            'SELECT 时间段, CAST(地铁线路 AS TEXT) AS 地铁线路, 站名, 进站, 出站 FROM station_flow '
+            'WHERE 日期 = ? ORDER BY 时间段, 地铁线路, 站名',
+            (date,)
+        )
+
+    def transfers(self, date):
+        """将相邻的进站、出站记录配对为行程，统计 进站线路 × 出站线路 的人次"""
+        return self.query('''
+            WITH ordered AS (
+                SELECT card_no, 交易类型, 地铁线路,
+                       LEAD(交易类型) OVER w AS 下一交易类型,
+                       LEAD(地铁线路) OVER w AS 下一线路
+                FROM records WHERE 日期 = ?
+                WINDOW w AS (PARTITION BY card_no ORDER BY 时间)
+            )
+            SELECT CAST(地铁线路 AS TEXT) AS 进站线路, CAST(下一线路 AS TEXT) AS 出站线路, COUNT(*) AS 人次
+            FROM ordered
+            WHERE 交易类型 = 0 AND 下一交易类型 = 1
+            GROUP BY 地铁线路, 下一线路
+        ''', (date,))
+
+    def station_od(self, station_names, date, slot_range=None, segment=None):
+        """
+        统计从该站出站乘客的进站来源，以及从该站进站乘客的出站目的地。
+        station_names 为同一站点在记录中的所有写法，
+        slot_range 为闭区间 (起始时间段, 结束时间段)，segment 为乘客分群标签。
+        """
+        # 条件直接写在每个查询中（不使用公共CTE），使站点和卡号索引都能被用到
+        def scope(alias, by_segment=True):
+            """指定日期、时间段和分群范围内记录的筛选条件和参数"""
+            conditions, params = [f'{alias}.日期 = ?'], [date]
+            if slot_range is not None:
+                conditions.append(f'{alias}.时间段 BETWEEN ? AND ?')
+                params.extend(slot_range)
+            if by_segment and segment is not None:
+                conditions.append(
+                    f'EXISTS (SELECT 1 FROM card_segments cs JOIN segment_summary ss ON ss.分群 = cs.分群 '
+                    f'WHERE cs.card_no = {alias}.card_no AND ss.标签 = ?)'
+                )
+                params.append(segment)
+            return ' AND '.join(conditions), params
+
+        placeholders = ', '.join('?' * len(station_names))
+
+        def counterpart_counts(own_type, other_type):
+            # 分群只与卡号有关，只需在选出该站乘客的子查询中筛选
+            card_where, card_params = scope('s')
+            where, params = scope('o', by_segment=False)
+            df = self.query(f'''
+                SELECT o.站名, COUNT(*) AS n FROM records o
+                WHERE o.交易类型 = ? AND {where} AND o.card_no IN (
+                    SELECT s.card_no FROM records s
+                    WHERE s.站名 IN ({placeholders}) AND s.交易类型 = ? AND {card_where}
+                )
+                GROUP BY o.站名 ORDER BY n DESC
+            ''', (other_type, *params, *station_names, own_type, *card_params))
+            return df.set_index('站名')['n']
+
+        where, params = scope('r')
+        totals = self.query(f'''
+            SELECT r.交易类型, COUNT(DISTINCT r.card_no) AS n FROM records r
+            WHERE r.站名 IN ({placeholders}) AND {where} GROUP BY r.交易类型
+        ''', (*station_names, *params)).set_index('交易类型')['n']
+
+        return {
+            'total_entries': int(totals.get(0, 0)),
+            'total_exits': int(totals.get(1, 0)),
+            'entry_stations': counterpart_counts(1, 0),
+            'exit_stations': counterpart_counts(0, 1),
+        }
+
+    def has_segment(self, segment):
+        return not self.query(
+            'SELECT 1 FROM segment_summary WHERE 标签 = ? LIMIT 1', (segment,)
+        ).empty
+
+
+def get_storage():
+    """根据环境变量 SUBWAY_STORAGE（csv 或 sqlite）选择存储后端，默认使用CSV"""
+    if os.getenv('SUBWAY_STORAGE', 'csv') == 'sqlite':
+        return SQLiteStorage()
+    return CsvStorage()
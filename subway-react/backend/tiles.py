@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# 瓦片配置
+TILE_CACHE_DIR = '../public/tile_cache'
+TILE_SIZE = 256          # 每块瓦片的像素边长
+CLUSTER_MAX_ZOOM = 14    # 低于该缩放级别时，点要素按网格聚合
+CLUSTER_GRID = 32        # 聚合时每块瓦片划分的网格数
+MAX_ZOOM = 18            # 支持的最大缩放级别
+
+
+def is_valid_tile(z, x, y):
+    """缩放级别在支持范围内，且 x/y 落在该级别的瓦片网格内"""
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def lonlat_to_pixel(lon, lat, z):
+    """经纬度转换为 Web Mercator 全局像素坐标"""
+    world_size = TILE_SIZE * 2 ** z
+    lat_rad = np.radians(lat)
+    px = (lon + 180.0) / 360.0 * world_size
+    py = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * world_size
+    return px, py
+
+
+def clip_to_tile(table, z, x, y):
+    """筛选落在瓦片 z/x/y 内的要素，并附上瓦片内的像素坐标"""
+    px, py = lonlat_to_pixel(table['lon'].values, table['lat'].values, z)
+    px = px - x * TILE_SIZE
+    py = py - y * TILE_SIZE
+    mask = (px >= 0) & (px < TILE_SIZE) & (py >= 0) & (py < TILE_SIZE)
+    clipped = table[mask].copy()
+    clipped['px'] = px[mask]
+    clipped['py'] = py[mask]
+    return clipped
+
+
+def cluster_points(clipped, sum_columns=()):
+    """将瓦片内的点按网格聚合，返回每个网格的中心、点数和求和字段"""
+    cell_size = TILE_SIZE / CLUSTER_GRID
+    cell = (clipped['py'] // cell_size).astype(int) * CLUSTER_GRID + (clipped['px'] // cell_size).astype(int)
+    grouped = clipped.groupby(cell.values)
+    clusters = grouped[['lon', 'lat']].mean()
+    clusters['count'] = grouped.size()
+    for column in sum_columns:
+        clusters[column] = grouped[column].sum()
+    return clusters.reset_index(drop=True)
+
+
+def to_feature_collection(table, property_columns):
+    """转换为 GeoJSON FeatureCollection"""
+    features = []
+    for row in table.to_dict('records'):
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [row['lon'], row['lat']]},
+            'properties': {c: row[c] for c in property_columns},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def get_tile(layer, table, z, x, y, property_columns, sum_columns=()):
+    """
+    获取图层瓦片的 GeoJSON 文本，优先读取磁盘缓存。
+    layer 为缓存子目录（如 stations、pois/3、flow/12），
+    缩放级别较低时按网格聚合，只保留点数和 sum_columns 的求和。
+    调用前需用 is_valid_tile 检查瓦片坐标。
+    """
+    cache_path = os.path.join(TILE_CACHE_DIR, layer, str(z), str(x), f'{y}.json')
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            return f.read()
+
+    clipped = clip_to_tile(table, z, x, y)
+    if z < CLUSTER_MAX_ZOOM and not clipped.empty:
+        clipped = cluster_points(clipped, sum_columns)
+        property_columns = ['count', *sum_columns]
+    content = json.dumps(to_feature_collection(clipped, property_columns), ensure_ascii=False)
+
+    # 先写入临时文件再替换，避免并发请求读到写了一半的瓦片
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, suffix='.tmp', delete=False) as f:
+        f.write(content)
+    os.replace(f.name, cache_path)
+    return content
+
+
+def build_poi_table(station_pois):
+    """将按站点存储的 POIs 展平为一张表"""
+    rows = []
+    for station, pois in station_pois.items():
+        for poi in pois:
+            rows.append({
+                'lon': poi['location']['x'],
+                'lat': poi['location']['y'],
+                'name': poi['name'],
+                'type': poi['location']['type'],
+                'original_type': poi['location']['original_type'],
+                'station': station,
+            })
+    return pd.DataFrame(rows, columns=['lon', 'lat', 'name', 'type', 'original_type', 'station'])
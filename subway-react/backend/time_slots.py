@@ -0,0 +1,7 @@
+import pandas as pd
+
+
+def to_time_slot(times, slot_minutes=30):
+    """将 HH:MM:SS 字符串转换为时间段编号，默认30分钟一段（0-47）"""
+    parsed = pd.to_datetime(times, format='%H:%M:%S')
+    return (parsed.dt.hour * 60 + parsed.dt.minute) // slot_minutes
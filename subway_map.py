@@ -1,20 +1,66 @@
+import os
+import shutil
+from functools import lru_cache
 import pandas as pd
 import dash
 from dash import html, dcc, callback, Input, Output
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
+FLOW_FILE = 'output_validated.csv'
+PARTITION_DIR = 'flow_by_date'  # 按日期拆分的刷卡记录，每天一个文件
+CHUNK_SIZE = 500000
+DAY_CACHE_SIZE = 8  # 内存中保留最近查看的天数
+
+def partition_by_date(flow_file, partition_dir):
+    """分块读取刷卡记录并按日期写入单独的文件，只需在数据更新后运行一次"""
+    # 先写入临时目录，全部完成后再替换，中途退出不会留下不完整的分区
+    tmp_dir = partition_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for chunk in pd.read_csv(flow_file, usecols=['日期', '时间', '交易类型', '站名'], chunksize=CHUNK_SIZE):
+        for date, rows in chunk.groupby('日期'):
+            path = os.path.join(tmp_dir, f'{date}.csv')
+            rows.to_csv(path, mode='a', index=False, header=not os.path.exists(path))
+
+    # 目录非空时不能直接被 os.replace 覆盖，先把旧分区移开
+    old_dir = partition_dir + '.old'
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    if os.path.exists(partition_dir):
+        os.replace(partition_dir, old_dir)
+    os.replace(tmp_dir, partition_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+@lru_cache(maxsize=DAY_CACHE_SIZE)
+def load_day_stats(date_str):
+    """读取一天的记录，统计每个10分钟区间各站点的进出站人数"""
+    day_df = pd.read_csv(os.path.join(PARTITION_DIR, f'{date_str}.csv'), usecols=['时间', '交易类型', '站名'])
+    times = pd.to_datetime(day_df['时间'], format='%H:%M:%S')
+    day_df['时间区间'] = (times.dt.hour * 60 + times.dt.minute) // 10
+    stats = day_df.groupby(['时间区间', '站名', '交易类型']).size().unstack(fill_value=0)
+    stats = stats.reindex(columns=[0, 1], fill_value=0)
+    stats.columns = ['进站', '出站']
+    return stats
+
 # 读取站点数据
 stations_df = pd.read_csv('station_coordinates.csv')
-flow_df = pd.read_csv('output_transformed.csv')
 
 # 移除没有坐标的站点
 stations_df = stations_df.dropna()
 
-# 处理flow_df的时间数据
-flow_df['datetime'] = pd.to_datetime(flow_df['日期'] + ' ' + flow_df['时间'])
-flow_df['date'] = flow_df['datetime'].dt.date
-unique_dates = sorted(flow_df['date'].unique())
+# 刷卡记录只在分区缺失或过期时拆分一次，之后启动时只列出日期，不读取记录；
+# 没有刷卡记录文件时直接使用已有的分区
+if os.path.exists(FLOW_FILE) and (
+    not os.path.isdir(PARTITION_DIR) or os.path.getmtime(PARTITION_DIR) < os.path.getmtime(FLOW_FILE)
+):
+    partition_by_date(FLOW_FILE, PARTITION_DIR)
+unique_dates = sorted(
+    datetime.strptime(name[:-len('.csv')], '%Y-%m-%d').date()
+    for name in os.listdir(PARTITION_DIR) if name.endswith('.csv')
+)
 
 # 创建10分钟时间区间
 time_intervals = []
@@ -99,16 +145,12 @@ def update_figure(time_interval, prev_clicks, next_clicks, current_date_str):
     start_time = datetime.strptime('00:00:00', '%H:%M:%S') + timedelta(minutes=10*time_interval)
     end_time = start_time + timedelta(minutes=10)
     
-    # 筛选当前时间区间的数据
-    mask = (flow_df['date'] == current_date) & \
-           (flow_df['datetime'].dt.time >= start_time.time()) & \
-           (flow_df['datetime'].dt.time < end_time.time())
-    current_flow = flow_df[mask]
-    
-    # 统计各站点进出站人数
-    station_stats = pd.DataFrame()
-    station_stats['进站'] = current_flow[current_flow['交易类型'] == 0]['站名'].value_counts()
-    station_stats['出站'] = current_flow[current_flow['交易类型'] == 1]['站名'].value_counts()
+    # 统计各站点进出站人数（按天缓存）
+    day_stats = load_day_stats(str(current_date))
+    if time_interval in day_stats.index.get_level_values('时间区间'):
+        station_stats = day_stats.loc[time_interval]
+    else:
+        station_stats = pd.DataFrame(columns=['进站', '出站'])
     
     # 创建基础图形
     fig = go.Figure()
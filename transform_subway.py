@@ -1,9 +1,6 @@
 import pandas as pd
 import re
 
-# Read the CSV file
-df = pd.read_csv('/Users/chubohan/Desktop/repo/final5024/output.csv')
-
 # Function to extract number from subway line
 def extract_line_number(line):
     # Chinese number mapping
@@ -26,12 +23,19 @@ def extract_line_number(line):
         return int(num.group(1))
     return line
 
-# Transform subway line numbers
-df['地铁线路'] = df['地铁线路'].apply(extract_line_number)
+def transform(input_file, output_file):
+    # Read the CSV file
+    df = pd.read_csv(input_file)
+
+    # Transform subway line numbers
+    df['地铁线路'] = df['地铁线路'].apply(extract_line_number)
+
+    # Transform transaction types (入站 -> 0, 出站 -> 1)
+    df['交易类型'] = df['交易类型'].apply(lambda x: 0 if '入站' in x else 1)
 
-# Transform transaction types (入站 -> 0, 出站 -> 1)
-df['交易类型'] = df['交易类型'].apply(lambda x: 0 if '入站' in x else 1)
+    # Save the transformed data
+    df.to_csv(output_file, index=False)
+    print(f"Transformation completed. Results saved to '{output_file}'")
 
-# Save the transformed data
-df.to_csv('output_transformed.csv', index=False)
-print("Transformation completed. Results saved to 'output_transformed.csv'")
+if __name__ == '__main__':
+    transform('output.csv', 'output_transformed.csv')
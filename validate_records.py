@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import sys
+import pandas as pd
+
+# 配置
+INPUT_FILE = 'output_transformed.csv'
+STATIONS_FILE = 'station_coordinates.csv'
+OUTPUT_FILE = 'output_validated.csv'
+QUARANTINE_FILE = 'quarantine.csv'
+REPORT_FILE = 'validation_report.json'
+PARTITION_DIR = 'validation_partitions'
+NUM_PARTITIONS = 64
+CHUNK_SIZE = 500000
+MAX_QUARANTINE_RATIO = 0.05  # 隔离比例超过该值时以非零状态退出
+
+COLUMNS = ['日期', '时间', '地铁线路', '交易类型', '站名', 'card_no']
+
+# 原因代码
+MISSING_FIELD = 'MISSING_FIELD'            # 必填字段为空
+BAD_TIMESTAMP = 'BAD_TIMESTAMP'            # 日期或时间无法解析
+BAD_DEAL_TYPE = 'BAD_DEAL_TYPE'            # 交易类型不是0或1
+UNPARSED_LINE = 'UNPARSED_LINE'            # 地铁线路未能转换为数字
+UNKNOWN_STATION = 'UNKNOWN_STATION'        # 站名不在站点坐标表中或缺少坐标
+UNMATCHED_ENTRY = 'UNMATCHED_ENTRY'        # 进站后没有对应的出站
+EXIT_WITHOUT_ENTRY = 'EXIT_WITHOUT_ENTRY'  # 出站前没有对应的进站
+
+
+def load_known_stations(stations_file):
+    """有坐标的站点集合"""
+    stations_df = pd.read_csv(stations_file).dropna()
+    return set(stations_df['站名'])
+
+
+def check_rows(chunk, known_stations):
+    """逐行检查字段，返回每行的原因代码（空字符串表示通过）"""
+    reason = pd.Series('', index=chunk.index)
+
+    # 后面的检查优先级更低，只在前面的检查通过时记录
+    checks = [
+        (MISSING_FIELD, chunk[COLUMNS].isna().any(axis=1)),
+        (BAD_TIMESTAMP, pd.to_datetime(chunk['日期'] + ' ' + chunk['时间'],
+                                       format='%Y-%m-%d %H:%M:%S', errors='coerce').isna()),
+        (BAD_DEAL_TYPE, ~chunk['交易类型'].isin([0, 1])),
+        (UNPARSED_LINE, pd.to_numeric(chunk['地铁线路'], errors='coerce').isna()),
+        (UNKNOWN_STATION, ~chunk['站名'].isin(known_stations)),
+    ]
+    for code, failed in checks:
+        reason = reason.mask((reason == '') & failed, code)
+    return reason
+
+
+def check_taps(df):
+    """
+    按卡号和时间排序后检查进出站配对，返回每行的原因代码。
+    同一张卡同一天内，进站后应紧跟出站，出站前应紧跟进站。
+    """
+    df = df.sort_values(['card_no', '日期', '时间'])
+    same_prev = (df['card_no'] == df['card_no'].shift(1)) & (df['日期'] == df['日期'].shift(1))
+    same_next = (df['card_no'] == df['card_no'].shift(-1)) & (df['日期'] == df['日期'].shift(-1))
+
+    unmatched_entry = (df['交易类型'] == 0) & ~(same_next & (df['交易类型'].shift(-1) == 1))
+    orphan_exit = (df['交易类型'] == 1) & ~(same_prev & (df['交易类型'].shift(1) == 0))
+
+    reason = pd.Series('', index=df.index)
+    reason[unmatched_entry] = UNMATCHED_ENTRY
+    reason[orphan_exit] = EXIT_WITHOUT_ENTRY
+    return df, reason
+
+
+def write_rows(df, path):
+    df.to_csv(path, mode='a', index=False, header=not os.path.exists(path))
+
+
+def main():
+    known_stations = load_known_stations(STATIONS_FILE)
+
+    for path in (OUTPUT_FILE, QUARANTINE_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.exists(PARTITION_DIR):
+        shutil.rmtree(PARTITION_DIR)
+    os.makedirs(PARTITION_DIR)
+
+    counts = {}
+    total = 0
+
+    # 第一遍：逐块做字段检查，通过的记录按卡号哈希分区，便于第二遍检查配对
+    for chunk in pd.read_csv(INPUT_FILE, chunksize=CHUNK_SIZE, dtype={'地铁线路': str}):
+        total += len(chunk)
+        reason = check_rows(chunk, known_stations)
+        bad = reason != ''
+        write_rows(chunk[bad].assign(原因=reason[bad]), QUARANTINE_FILE)
+        for code, n in reason[bad].value_counts().items():
+            counts[code] = counts.get(code, 0) + int(n)
+
+        good = chunk[~bad]
+        part = pd.util.hash_pandas_object(good['card_no'], index=False) % NUM_PARTITIONS
+        for part_id, rows in good.groupby(part.values):
+            write_rows(rows, os.path.join(PARTITION_DIR, f'part_{part_id}.csv'))
+
+    # 第二遍：每个分区包含若干张卡的全部记录，检查进出站配对
+    for name in sorted(os.listdir(PARTITION_DIR)):
+        df, reason = check_taps(pd.read_csv(os.path.join(PARTITION_DIR, name)))
+        bad = reason != ''
+        write_rows(df[bad].assign(原因=reason[bad]), QUARANTINE_FILE)
+        write_rows(df[~bad], OUTPUT_FILE)
+        for code, n in reason[bad].value_counts().items():
+            counts[code] = counts.get(code, 0) + int(n)
+    shutil.rmtree(PARTITION_DIR)
+
+    quarantined = sum(counts.values())
+    report = {
+        'input_file': INPUT_FILE,
+        'total_records': total,
+        'valid_records': total - quarantined,
+        'quarantined_records': quarantined,
+        'quarantine_ratio': round(quarantined / total, 6) if total else 0,
+        'reasons': counts,
+    }
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"有效记录已保存到 {OUTPUT_FILE}，异常记录已隔离到 {QUARANTINE_FILE}")
+
+    if report['quarantine_ratio'] > MAX_QUARANTINE_RATIO:
+        print(f"异常记录比例超过 {MAX_QUARANTINE_RATIO:.0%}，请检查数据后再生成下游结果")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()